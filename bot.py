@@ -1,12 +1,30 @@
 import os
+import re
 import logging
-import subprocess
-import tempfile
 import io
 import asyncio
-from telegram import Update, File
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from openai import OpenAI
+import hashlib
+import weakref
+from collections import OrderedDict, deque
+from contextlib import aclosing
+import httpx
+from telegram import File, LinkPreviewOptions, Message, Update
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import AIORateLimiter, Application, CommandHandler, MessageHandler, filters, ContextTypes
+import openai
+from openai import AsyncOpenAI
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+try:
+    import uvloop  # Более быстрый event loop на libuv (недоступен на Windows)
+except ImportError:
+    uvloop = None
 
 # Настройка логирования
 logging.basicConfig(
@@ -28,17 +46,53 @@ if not OPENAI_API_KEY:
     exit(1)
 
 # --- Инициализация клиента OpenAI ---
-CLIENT = OpenAI(api_key=OPENAI_API_KEY)
+# Один общий асинхронный HTTP-клиент на весь процесс; закрывается в post_shutdown
+# HTTP/2 мультиплексирует запросы LLM, STT и TTS поверх одного TLS-соединения
+HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=30),
+    timeout=httpx.Timeout(60.0, connect=5.0)
+)
+# Повторы выполняет openai_retry ниже, встроенные повторы SDK отключены, чтобы они не перемножались
+CLIENT = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=HTTP_CLIENT, max_retries=0)
+
+# --- Повтор запросов к OpenAI при временных ошибках (429, 5xx, обрыв соединения) ---
+RETRYABLE_OPENAI_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+RETRY_MAX_WAIT = 8
+_backoff_wait = wait_exponential_jitter(initial=1, max=RETRY_MAX_WAIT)
+
+
+def _retry_wait(retry_state) -> float:
+    """Ждёт столько, сколько просит заголовок Retry-After, иначе — экспоненциально с джиттером."""
+    response = getattr(retry_state.outcome.exception(), "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), RETRY_MAX_WAIT)
+    except (TypeError, ValueError):
+        return _backoff_wait(retry_state)
+
+
+openai_retry = retry(
+    retry=retry_if_exception_type(RETRYABLE_OPENAI_ERRORS),
+    wait=_retry_wait,
+    stop=stop_after_attempt(4),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
 
 # --- Настройки моделей 2025 ---
 LLM_MODEL = "gpt-5-nano"       # Новая ультра-быстрая текстовая модель
 AUDIO_MODEL = "gpt-audio-mini" # Универсальная аудиомодель нового поколения
 
-# --- LLM Integration Functions ---
-def get_llm_response(prompt: str) -> str:
-    """Получает ответ от модели GPT-5 nano."""
-    try:
-        system_prompt = """
+# Минимальный интервал между правками сообщения при потоковом ответе (лимит Telegram ~1 сообщение/с на чат)
+STREAM_EDIT_INTERVAL = 1.0
+
+# --- Системный промпт психолога ---
+SYSTEM_PROMPT = """
 Ты - профессиональный психолог с 20-летним опытом работы. 
 Твоя задача - оказывать качественную психологическую поддержку.
 
@@ -62,110 +116,256 @@ def get_llm_response(prompt: str) -> str:
 
 Отвечай на русском языке естественно и тепло.
 """
-        response = CLIENT.chat.completions.create(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=800,
-            temperature=0.8,
-            top_p=0.9,
-            frequency_penalty=0.1,
-            presence_penalty=0.1
-        )
-        return response.choices[0].message.content
 
-    except Exception as e:
-        logger.error(f"Error getting LLM response from {LLM_MODEL}: {e}")
-        # Fallback на более старую модель если новая недоступна
-        try:
-            logger.info("Trying fallback to gpt-4o...")
-            response = CLIENT.chat.completions.create(
+FALLBACK_SYSTEM_PROMPT = "Ты психолог. Отвечай поддерживающе."
+
+# Общие параметры генерации для обычного и потокового запроса
+LLM_PARAMS = {
+    "max_tokens": 800,
+    "temperature": 0.8,
+    "top_p": 0.9,
+    "frequency_penalty": 0.1,
+    "presence_penalty": 0.1,
+}
+
+# LRU-кэш ответов на короткие повторяющиеся вопросы (приветствия, частые вопросы)
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_MAX_PROMPT_LENGTH = 200
+RESPONSE_CACHE: "OrderedDict[bytes, str]" = OrderedDict()
+
+# История диалога: последние HISTORY_MAX_MESSAGES сообщений каждого пользователя,
+# не длиннее HISTORY_MAX_CHARS символов; хранится для HISTORY_MAX_USERS самых активных
+HISTORY_MAX_MESSAGES = 8
+HISTORY_MAX_CHARS = 6000
+HISTORY_MAX_USERS = 10000
+CONVERSATIONS: "OrderedDict[int, deque]" = OrderedDict()
+# Чтение истории → генерация → запись выполняются под замком пользователя,
+# иначе параллельные сообщения (concurrent_updates) перемешали бы пары вопрос-ответ
+USER_LOCKS: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+LLM_ERROR_TEXT = "Благодарю вас за обращение. Сейчас возникла техническая ошибка. Пожалуйста, попробуйте позже."
+
+# Ограничение одновременных обращений к OpenAI, чтобы всплеск сообщений не исчерпал память и соединения
+LLM_SEMAPHORE = asyncio.Semaphore(int(os.environ.get("LLM_CONCURRENCY", 20)))
+AUDIO_SEMAPHORE = asyncio.Semaphore(int(os.environ.get("AUDIO_CONCURRENCY", 8)))
+
+# Сколько раз AIORateLimiter повторяет запрос к Telegram после RetryAfter (по умолчанию в PTB — 0).
+# Лимитер ограничивает общий поток и группы, но не личные чаты: там частоту правок
+# сдерживает STREAM_EDIT_INTERVAL, а голосовые фрагменты уходят строго по одному.
+TELEGRAM_MAX_RETRIES = 3
+
+# Сколько обновлений Telegram обрабатывается параллельно; остальные ждут в очереди PTB
+CONCURRENT_UPDATES = int(os.environ.get("CONCURRENT_UPDATES", 64))
+
+
+# --- LLM Integration Functions ---
+def build_messages(prompt: str, system_prompt: str = SYSTEM_PROMPT, history: list = ()) -> list:
+    """Собирает сообщения для модели; системный промпт всегда первый и неизменный,
+    чтобы OpenAI мог переиспользовать закэшированный префикс."""
+    return [
+        {"role": "system", "content": system_prompt},
+        *history,
+        {"role": "user", "content": prompt}
+    ]
+
+
+def user_lock(user_id: int) -> asyncio.Lock:
+    """Возвращает замок пользователя; замки без владельцев удаляются сборщиком мусора."""
+    return USER_LOCKS.setdefault(user_id, asyncio.Lock())
+
+
+def get_history(user_id: int) -> list:
+    """Возвращает копию истории диалога пользователя."""
+    if user_id not in CONVERSATIONS:
+        return []
+    CONVERSATIONS.move_to_end(user_id)
+    return list(CONVERSATIONS[user_id])
+
+
+def remember_turn(user_id: int, user_text: str, reply: str) -> None:
+    """Добавляет реплику пользователя и ответ в историю, вытесняя самые старые."""
+    if not reply or reply == LLM_ERROR_TEXT:
+        return
+
+    history = CONVERSATIONS.setdefault(user_id, deque(maxlen=HISTORY_MAX_MESSAGES))
+    CONVERSATIONS.move_to_end(user_id)
+    history.append({"role": "user", "content": user_text})
+    history.append({"role": "assistant", "content": reply})
+
+    # Удаляем старые пары вопрос-ответ, пока история не уложится в лимит
+    while len(history) > 2 and sum(len(m["content"]) for m in history) > HISTORY_MAX_CHARS:
+        history.popleft()
+        history.popleft()
+
+    if len(CONVERSATIONS) > HISTORY_MAX_USERS:
+        CONVERSATIONS.popitem(last=False)
+
+
+def log_prompt_cache_usage(usage) -> None:
+    """Логирует, сколько токенов промпта взято из кэша OpenAI."""
+    details = getattr(usage, "prompt_tokens_details", None) if usage else None
+    if details is not None:
+        logger.info(f"Prompt cache: {details.cached_tokens or 0}/{usage.prompt_tokens} tokens cached")
+
+
+def response_cache_key(prompt: str) -> bytes | None:
+    """Возвращает ключ кэша для запроса или None, если его не стоит кэшировать."""
+    normalized = " ".join(prompt.lower().split())
+    if len(normalized) > RESPONSE_CACHE_MAX_PROMPT_LENGTH or check_crisis_situation(normalized):
+        return None
+    return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+
+
+def get_cached_response(key: bytes | None) -> str | None:
+    """Достаёт ответ из кэша, отмечая его как недавно использованный."""
+    if key is None or key not in RESPONSE_CACHE:
+        return None
+    RESPONSE_CACHE.move_to_end(key)
+    return RESPONSE_CACHE[key]
+
+
+def store_cached_response(key: bytes | None, response: str) -> None:
+    """Сохраняет ответ в кэш, вытесняя самый старый при переполнении."""
+    if key is None or not response:
+        return
+    RESPONSE_CACHE[key] = response
+    RESPONSE_CACHE.move_to_end(key)
+    if len(RESPONSE_CACHE) > RESPONSE_CACHE_SIZE:
+        RESPONSE_CACHE.popitem(last=False)
+
+
+async def get_fallback_response(prompt: str, history: list = ()) -> str:
+    """Получает ответ от запасной модели gpt-4o, когда основная недоступна."""
+    try:
+        logger.info("Trying fallback to gpt-4o...")
+        async with LLM_SEMAPHORE:
+            response = await CLIENT.chat.completions.create(
                 model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Ты психолог. Отвечай поддерживающе."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=build_messages(prompt, FALLBACK_SYSTEM_PROMPT, history),
                 max_tokens=500
             )
-            return response.choices[0].message.content
-        except Exception as fallback_error:
-            logger.error(f"Fallback also failed: {fallback_error}")
-            return "Благодарю вас за обращение. Сейчас возникла техническая ошибка. Пожалуйста, попробуйте позже."
+        return response.choices[0].message.content
+    except Exception as fallback_error:
+        logger.error(f"Fallback also failed: {fallback_error}")
+        return LLM_ERROR_TEXT
+
+
+@openai_retry
+async def _open_chat_stream(messages: list):
+    """Открывает потоковый ответ основной модели (повторяется только до первого токена)."""
+    return await CLIENT.chat.completions.create(
+        model=LLM_MODEL,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        **LLM_PARAMS
+    )
+
+
+async def stream_llm_response(prompt: str, history: list = ()):
+    """Потоково получает ответ от модели GPT-5 nano, выдавая фрагменты текста."""
+    # Ответ зависит от контекста, поэтому кэшируем только первые сообщения диалога
+    cache_key = None if history else response_cache_key(prompt)
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    # Слот держится, пока поток открыт; поток закрывается, даже если потребитель прервал чтение
+    async with LLM_SEMAPHORE:
+        stream = await _open_chat_stream(build_messages(prompt, history=history))
+        async with stream:
+            async for chunk in stream:
+                if chunk.usage:
+                    log_prompt_cache_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+
+    store_cached_response(cache_key, "".join(parts))
 
 
 # --- Speech Integration Functions (STT/TTS) ---
+@openai_retry
+async def _transcribe(ogg_bytes: bytes) -> str:
+    """Отправляет OGG/Opus на распознавание."""
+    # Голосовые Telegram уже в OGG/Opus, который API распознаёт без перекодирования
+    return await CLIENT.audio.transcriptions.create(
+        model=AUDIO_MODEL,
+        file=("voice.ogg", ogg_bytes),
+        language="ru",
+        response_format="text"
+    )
+
+
+@openai_retry
+async def _synthesize(text: str) -> bytes:
+    """Получает синтезированную речь потоком в OGG/Opus."""
+    # Telegram принимает OGG/Opus как голосовое без перекодирования
+    buffer = io.BytesIO()
+    async with AUDIO_SEMAPHORE, CLIENT.audio.speech.with_streaming_response.create(
+        model=AUDIO_MODEL,
+        voice="alloy",
+        input=text,
+        speed=1.0,
+        response_format="opus"
+    ) as response:
+        async for chunk in response.iter_bytes():
+            buffer.write(chunk)
+
+    return buffer.getvalue()
+
+
 async def transcribe_voice_message(voice_file: File) -> str:
     """Распознаёт речь с помощью gpt-audio-mini."""
-    ogg_path = mp3_path = None
     try:
-        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as ogg_file:
-            ogg_path = ogg_file.name
-        await voice_file.download_to_drive(ogg_path)
-        logger.info(f"Downloaded voice file to {ogg_path}")
-
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as mp3_file:
-            mp3_path = mp3_file.name
-
-        logger.info(f"Converting audio from {ogg_path} to {mp3_path}")
-        result = subprocess.run([
-            "ffmpeg", "-i", ogg_path, "-acodec", "libmp3lame",
-            "-ac", "1", "-ar", "16000", mp3_path, "-y"
-        ], capture_output=True, text=True, timeout=30)
-        
-        if result.returncode != 0:
-            logger.error(f"FFmpeg error: {result.stderr}")
-            return ""
-
-        with open(mp3_path, "rb") as audio_file:
-            # Используем новую модель gpt-audio-mini
-            transcript = CLIENT.audio.transcriptions.create(
-                model=AUDIO_MODEL,
-                file=audio_file,
-                language="ru",
-                response_format="text"
-            )
+        # Слот держится от скачивания до распознавания, чтобы в памяти лежало не больше
+        # AUDIO_SEMAPHORE голосовых одновременно
+        async with AUDIO_SEMAPHORE:
+            ogg_bytes = bytes(await voice_file.download_as_bytearray())
+            logger.info(f"Downloaded voice file ({len(ogg_bytes)} bytes)")
 
+            transcript = await _transcribe(ogg_bytes)
         logger.info(f"Transcription successful: {transcript[:100]}...")
         return transcript
 
     except Exception as e:
         logger.error(f"Error during transcription: {e}")
         return ""
-    finally:
-        for path in [ogg_path, mp3_path]:
-            if path and os.path.exists(path):
-                try:
-                    os.unlink(path)
-                except Exception as e:
-                    logger.error(f"Error deleting temp file {path}: {e}")
+
+
+# Ответ озвучивается фрагментами из целых предложений не короче VOICE_FRAGMENT_MIN_CHARS,
+# всего не больше VOICE_MAX_CHARS символов
+VOICE_FRAGMENT_MIN_CHARS = 200
+VOICE_MAX_CHARS = 1000
+# Точка после цифры («1. », «2. ») — номер пункта списка, а не конец предложения
+SENTENCE_END = re.compile(r"(?<!\d)[.!?…]+\s+")
+
+
+def split_voice_fragment(text: str) -> tuple[str, str]:
+    """Отделяет от начала текста законченные предложения, если их набралось на фрагмент."""
+    end = None
+    for match in SENTENCE_END.finditer(text):
+        end = match.end()
+    if end is None or end < VOICE_FRAGMENT_MIN_CHARS:
+        return "", text
+    return text[:end].strip(), text[end:]
 
 
 async def synthesize_speech(text: str) -> bytes:
     """Синтезирует речь (TTS) с помощью gpt-audio-mini."""
     try:
-        if len(text) > 1000:
-            text = text[:1000] + "..."
-
-        # Используем новую модель gpt-audio-mini для TTS
-        response = CLIENT.audio.speech.create(
-            model=AUDIO_MODEL,
-            voice="alloy",
-            input=text,
-            speed=1.0
-        )
-            
-        return response.content
+        return await _synthesize(text)
     except Exception as e:
         logger.error(f"Error during speech synthesis: {e}")
         return b""
 
 
-# --- Telegram Handlers ---
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Обрабатывает команду /start."""
-    welcome_text = f"""
+# --- Тексты сообщений (собираются один раз при запуске) ---
+NO_LINK_PREVIEW = LinkPreviewOptions(is_disabled=True)
+
+WELCOME_TEXT = f"""
 🧠 *Добро пожаловать в кабинет современной психологической помощи 2025!*
 
 Я - ваш виртуальный психолог, работающий на основе новейших технологий AI.
@@ -183,12 +383,8 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 Расскажите, что вас беспокоит, и я постараюсь помочь.
 """
-    await update.message.reply_text(welcome_text, parse_mode="Markdown")
-
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Обрабатывает команду /help."""
-    help_text = f"""
+HELP_TEXT = f"""
 🌟 *Психологическая помощь нового поколения*
 
 *Технологии 2025 года:*
@@ -207,12 +403,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 Вы не одиноки — помощь доступна круглосуточно.
 """
-    await update.message.reply_text(help_text, parse_mode="Markdown")
-
 
-async def model_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Показывает информацию о используемых моделях."""
-    info_text = f"""
+MODEL_INFO_TEXT = f"""
 🤖 *Система психологической помощи 2025*
 
 *Текстовая модель:* `{LLM_MODEL}`
@@ -227,28 +419,8 @@ async def model_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 *Технологии:* OpenAI Generation 5
 """
-    await update.message.reply_text(info_text, parse_mode="Markdown")
 
-
-def check_crisis_situation(text: str) -> bool:
-    """Проверяет наличие кризисных слов."""
-    crisis_keywords = [
-        'суицид', 'самоубийство', 'умру', 'покончить',
-        'кризис', 'хочу умереть', 'наложу на себя руки',
-        'самоповреждение', 'режу себя', 'больше не могу',
-        'кончу жизнь', 'сведу счеты', 'лучше умереть'
-    ]
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in crisis_keywords)
-
-
-async def text_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Обрабатывает текстовые сообщения."""
-    user_text = update.message.text
-    logger.info(f"Received text from user {update.message.from_user.id}: {user_text}")
-
-    if check_crisis_situation(user_text):
-        crisis_response = """
+CRISIS_TEXT = """
 🚨 *ЭКСТРЕННАЯ ПОМОЩЬ*
 
 Похоже, вы переживаете очень тяжёлые чувства.  
@@ -261,17 +433,140 @@ async def text_message_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
 *Не оставайтесь в одиночестве.* Обращение за помощью - это проявление силы.
 """
-        await update.message.reply_text(crisis_response, parse_mode="Markdown")
+
+VOICE_CRISIS_TEXT = """
+🚨 *Услышал, что вам очень тяжело.*
+
+Пожалуйста, немедленно обратитесь за помощью:
+📞 **8-800-2000-122** - круглосуточная помощь
+🚑 **112** - экстренная служба
+
+Ваша жизнь важна!
+"""
+
+
+# --- Telegram Handlers ---
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обрабатывает команду /start."""
+    await update.message.reply_text(WELCOME_TEXT, parse_mode="Markdown", link_preview_options=NO_LINK_PREVIEW)
+
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обрабатывает команду /help."""
+    await update.message.reply_text(HELP_TEXT, parse_mode="Markdown", link_preview_options=NO_LINK_PREVIEW)
+
+
+async def model_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показывает информацию о используемых моделях."""
+    await update.message.reply_text(MODEL_INFO_TEXT, parse_mode="Markdown", link_preview_options=NO_LINK_PREVIEW)
+
+
+CRISIS_KEYWORDS = [
+    'суицид', 'самоубийство', 'умру', 'покончить',
+    'кризис', 'хочу умереть', 'наложу на себя руки',
+    'самоповреждение', 'режу себя', 'больше не могу',
+    'кончу жизнь', 'сведу счеты', 'лучше умереть'
+]
+
+# Шаблон компилируется один раз; re.IGNORECASE сравнивает без учёта регистра прямо
+# по исходной строке, без копии text.lower()
+CRISIS_PATTERN = re.compile("|".join(map(re.escape, CRISIS_KEYWORDS)), re.IGNORECASE)
+
+
+def check_crisis_situation(text: str) -> bool:
+    """Проверяет наличие кризисных слов в любом регистре."""
+    return CRISIS_PATTERN.search(text) is not None
+
+
+async def text_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обрабатывает текстовые сообщения."""
+    user_text = update.message.text
+    user_id = update.message.from_user.id
+    logger.info(f"Received text from user {user_id}: {user_text}")
+
+    if check_crisis_situation(user_text):
+        await update.message.reply_text(CRISIS_TEXT, parse_mode="Markdown")
         return
 
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
 
+    # Сообщения одного пользователя обрабатываются по очереди, чтобы история не перемешивалась
+    async with user_lock(user_id):
+        await stream_text_reply(update, user_id, user_text)
+
+
+async def update_streamed_reply(update: Update, reply: Message | None, text: str) -> Message:
+    """Отправляет первое сообщение потокового ответа или правит уже отправленное."""
+    try:
+        if reply is None:
+            return await update.message.reply_text(text)
+        await reply.edit_text(text)
+    except BadRequest as e:
+        # Telegram отклоняет правку, если после его нормализации текст не изменился
+        if "not modified" not in str(e).lower():
+            raise
+    return reply
+
+
+async def stream_text_reply(update: Update, user_id: int, user_text: str) -> None:
+    """Отвечает на текст потоково, редактируя сообщение по мере генерации."""
+    history = get_history(user_id)
+    loop = asyncio.get_running_loop()
+    reply = None
+    sent_text = llm_response = ""
+    last_update = 0.0
+    stream_failed = False
     try:
-        llm_response = get_llm_response(user_text)
-        await update.message.reply_text(llm_response)
+        async with aclosing(stream_llm_response(user_text, history)) as deltas:
+            async for delta in deltas:
+                llm_response += delta
+                text = llm_response.strip()
+                if not text or text == sent_text or loop.time() - last_update < STREAM_EDIT_INTERVAL:
+                    continue
+
+                last_update = loop.time()
+                try:
+                    reply = await update_streamed_reply(update, reply, text)
+                    sent_text = text
+                except TelegramError as e:
+                    # Промежуточное обновление не критично: итоговый текст отправится после потока
+                    logger.warning(f"Could not update streamed reply: {e}")
     except Exception as e:
-        logger.error(f"Error in text handler: {e}")
+        logger.error(f"Error streaming LLM reply: {e}")
+        stream_failed = True
+
+    if not llm_response.strip():
+        # Поток не дал текста, а основная модель уже исчерпала повторы — сразу идём к запасной
+        llm_response = await get_fallback_response(user_text, history)
+        stream_failed = False
+
+    if llm_response.strip() != sent_text:
+        reply = await update_streamed_reply(update, reply, llm_response.strip())
+
+    if stream_failed:
+        # Поток оборвался на середине: пользователь видит только часть ответа
         await update.message.reply_text("⚠️ Произошла ошибка при обработке вашего сообщения. Пожалуйста, попробуйте позже.")
+        return
+
+    remember_turn(user_id, user_text, llm_response.strip())
+
+
+async def send_voice_fragments(update: Update, queue: asyncio.Queue) -> None:
+    """Отправляет озвученные фрагменты ответа по порядку по мере готовности синтеза."""
+    first = True
+    while (item := await queue.get()) is not None:
+        fragment, synthesis = item
+        audio_content = await synthesis
+        if audio_content:
+            await update.message.reply_voice(
+                voice=io.BytesIO(audio_content),
+                caption=f"💬 Ответ от {LLM_MODEL}" if first else None,
+                parse_mode="Markdown"
+            )
+        else:
+            # Синтез не удался — отправляем этот фрагмент текстом
+            await update.message.reply_text(fragment)
+        first = False
 
 
 async def voice_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -280,9 +575,11 @@ async def voice_message_handler(update: Update, context: ContextTypes.DEFAULT_TY
     if not voice:
         return
 
+    chat_id = update.effective_chat.id
     logger.info(f"Received voice message from user {update.message.from_user.id}")
     voice_file = await context.bot.get_file(voice.file_id)
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="record_audio")
+    # Статус отправляется фоном и не задерживает распознавание
+    context.application.create_task(context.bot.send_chat_action(chat_id=chat_id, action="record_audio"), update=update)
 
     transcribed_text = await transcribe_voice_message(voice_file)
     if not transcribed_text:
@@ -292,36 +589,76 @@ async def voice_message_handler(update: Update, context: ContextTypes.DEFAULT_TY
     logger.info(f"Transcribed text: {transcribed_text}")
 
     if check_crisis_situation(transcribed_text):
-        crisis_response = """
-🚨 *Услышал, что вам очень тяжело.*
-
-Пожалуйста, немедленно обратитесь за помощью:
-📞 **8-800-2000-122** - круглосуточная помощь
-🚑 **112** - экстренная служба
-
-Ваша жизнь важна!
-"""
-        await update.message.reply_text(crisis_response, parse_mode="Markdown")
+        await update.message.reply_text(VOICE_CRISIS_TEXT, parse_mode="Markdown")
         return
 
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-    llm_response = get_llm_response(transcribed_text)
+    context.application.create_task(context.bot.send_chat_action(chat_id=chat_id, action="record_audio"), update=update)
+    user_id = update.message.from_user.id
+    async with user_lock(user_id):
+        await stream_voice_reply(update, user_id, transcribed_text)
+
+
+async def stream_voice_reply(update: Update, user_id: int, transcribed_text: str) -> None:
+    """Озвучивает ответ LLM фрагментами по мере генерации."""
+    history = get_history(user_id)
+
+    # Конвейер: LLM генерирует текст, готовые фрагменты сразу уходят в TTS,
+    # а отправитель публикует озвученные фрагменты по порядку
+    queue: asyncio.Queue = asyncio.Queue()
+    sender = asyncio.create_task(send_voice_fragments(update, queue))
+    llm_response = pending = ""
+    voiced_parts = []
+    voiced_chars = 0
+    failed = False
+
+    def queue_fragment(fragment: str) -> None:
+        nonlocal voiced_chars
+        # Если отправитель упал, озвучивать уже некому
+        if sender.done() or voiced_chars >= VOICE_MAX_CHARS:
+            return
+        if voiced_chars + len(fragment) > VOICE_MAX_CHARS:
+            fragment = fragment[:VOICE_MAX_CHARS - voiced_chars] + "..."
+        voiced_chars += len(fragment)
+        voiced_parts.append(fragment)
+        queue.put_nowait((fragment, asyncio.create_task(synthesize_speech(fragment))))
+
+    try:
+        async with aclosing(stream_llm_response(transcribed_text, history)) as deltas:
+            async for delta in deltas:
+                if sender.done():
+                    break
+                llm_response += delta
+                fragment, pending = split_voice_fragment(pending + delta)
+                if fragment:
+                    queue_fragment(fragment)
+    except Exception as e:
+        logger.error(f"Error streaming voice reply: {e}")
+        failed = bool(llm_response)
 
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="record_audio")
-    audio_content = await synthesize_speech(llm_response)
+    if not llm_response:
+        # Основная модель уже исчерпала повторы в потоке — сразу идём к запасной
+        llm_response = pending = await get_fallback_response(transcribed_text, history)
 
-    if not audio_content:
-        await update.message.reply_text(
-            f"🎤 *Вы сказали:* {transcribed_text}\n\n💬 *Мой ответ:* {llm_response}",
-            parse_mode="Markdown"
-        )
+    if pending.strip():
+        queue_fragment(pending.strip())
+    queue.put_nowait(None)
+    try:
+        await sender
+    except Exception as e:
+        logger.error(f"Error sending voice reply: {e}")
+        failed = True
+        # Отменяем синтез фрагментов, которые уже не будут отправлены
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                item[1].cancel()
+
+    if failed:
+        await update.message.reply_text("⚠️ Произошла ошибка при обработке вашего сообщения. Пожалуйста, попробуйте позже.")
         return
 
-    await update.message.reply_voice(
-        voice=io.BytesIO(audio_content),
-        caption=f"💬 Ответ от {LLM_MODEL}",
-        parse_mode="Markdown"
-    )
+    # В историю попадает только озвученная часть: остальное пользователь не слышал
+    remember_turn(user_id, transcribed_text, " ".join(voiced_parts))
 
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -329,43 +666,89 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     logger.error(f"Exception: {context.error}")
 
 
+async def warm_up() -> None:
+    """Заранее открывает соединение с OpenAI, чтобы первый пользователь не ждал."""
+    try:
+        await CLIENT.models.list()
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+
+
+async def post_init(application: Application) -> None:
+    """Прогревает клиентов после инициализации бота."""
+    await warm_up()
+
+
+async def post_shutdown(application: Application) -> None:
+    """Закрывает общий HTTP-клиент OpenAI при остановке."""
+    await CLIENT.close()
+
+
 # --- Main Application Setup ---
-def main() -> None:
-    """Запускает Telegram-бота."""
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+def build_application() -> Application:
+    """Создаёт приложение Telegram-бота со всеми обработчиками."""
+    # Политика должна быть установлена до того, как PTB создаст event loop
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .rate_limiter(AIORateLimiter(max_retries=TELEGRAM_MAX_RETRIES))
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .build()
+    )
 
     # Команды
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("model", model_info_command))
 
-    # Сообщения
+    # Сообщения: concurrent_updates запускает обработчики параллельно и ограничивает их число
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_message_handler))
     application.add_handler(MessageHandler(filters.VOICE, voice_message_handler))
 
     # Ошибки
     application.add_error_handler(error_handler)
 
-    webhook_url = os.environ.get('RENDER_EXTERNAL_URL')
+    return application
+
+
+def run_webhook(webhook_url: str) -> None:
+    """Запускает бота в режиме webhook (продакшен на Render)."""
     port = int(os.environ.get('PORT', 10000))
+    logger.info(f"🚀 Starting 2025 AI Psychologist Bot with webhook on port {port}")
+
+    build_application().run_webhook(
+        listen="0.0.0.0",
+        port=port,
+        url_path=TELEGRAM_TOKEN,
+        webhook_url=f"{webhook_url}/{TELEGRAM_TOKEN}",
+        allowed_updates=["message"],
+        drop_pending_updates=True
+    )
+
+
+def run_polling() -> None:
+    """Запускает бота в режиме polling (локальная разработка)."""
+    logger.info("🔧 Starting bot in polling mode (development)")
+    build_application().run_polling(
+        drop_pending_updates=True,
+        allowed_updates=["message"]
+    )
 
+
+def main() -> None:
+    """Запускает Telegram-бота."""
+    webhook_url = os.environ.get('RENDER_EXTERNAL_URL')
     if webhook_url:
-        logger.info(f"🚀 Starting 2025 AI Psychologist Bot with webhook on port {port}")
-        
-        # Упрощенный запуск без initialize()
-        application.run_webhook(
-            listen="0.0.0.0",
-            port=port,
-            webhook_url=f"{webhook_url}/{TELEGRAM_TOKEN}",
-            drop_pending_updates=True
-        )
-            
+        run_webhook(webhook_url)
     else:
-        logger.info("🔧 Starting bot in polling mode (development)")
-        application.run_polling(
-            drop_pending_updates=True,
-            allowed_updates=["message"]
-        )
+        run_polling()
+
 
 if __name__ == '__main__':
     main()
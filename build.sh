@@ -3,7 +3,7 @@ set -e
 
 echo "Installing system dependencies..."
 apt-get update
-apt-get install -y ffmpeg libsndfile1 libopus0
+apt-get install -y libsndfile1 libopus0
 
 echo "Installing Python dependencies..."
 pip install --upgrade pip